@@ -145,6 +145,8 @@ class DF:
       
       if code!=None:  
         Node(self.goal, self.gen, self.pruner, es, i, w, code=code)
+      elif self.useC:
+        self.goal.compileC(es) # Without the test selection code the goal scores the tests, and may have its own code for doing so.
       if errCode!=None:
         Node.error.im_func(None, self.goal, self.gen, es, i, w, self.inc, code = errCode)
       return
@@ -166,7 +168,7 @@ class DF:
     if train.shape[0]==0: return # Safety for if it selects to use none of the items - do nothing...
     
     # Grow a tree...
-    tree = Node(self.goal, self.gen, self.pruner, es, train, trainWeight, code=code)
+    tree = Node(self.goal, self.gen, self.pruner, es, train, trainWeight, code=code, useC=self.useC)
     
     # Apply the goal-specific post processor to the tree...
     self.goal.postTreeGrow(tree, self.gen)
@@ -223,13 +225,16 @@ class DF:
           Node.addTrain.im_func(None, self.goal, self.gen, es, i, w, c)
       addCode = self.addTrainCodeC[key]
       
+      if mp and self.grow and self.useC and code==None:
+        self.goal.compileC(es) # Growth will score tests using the goal - compile any code it has for that in advance as well.
+      
       if mp:
-        result = pool.map_async(updateTree, map(lambda tree_tup: (self.goal, self.gen, self.pruner if self.grow else None, tree_tup, self.trainCount, newCount, es, weightChannel, (code, errCode, addCode), treesDone, numpy.random.randint(1000000000)), self.trees))
+        result = pool.map_async(updateTree, map(lambda tree_tup: (self.goal, self.gen, self.pruner if self.grow else None, tree_tup, self.trainCount, newCount, es, weightChannel, (code, errCode, addCode, self.useC), treesDone, numpy.random.randint(1000000000)), self.trees))
       else:
         newTrees = []
         for ti, tree_tup in enumerate(self.trees):
           if callback: callback(ti, totalTrees)
-          data = (self.goal, self.gen, self.pruner if self.grow else None, tree_tup, self.trainCount, newCount, es, weightChannel, (code, errCode, addCode))
+          data = (self.goal, self.gen, self.pruner if self.grow else None, tree_tup, self.trainCount, newCount, es, weightChannel, (code, errCode, addCode, self.useC))
           newTrees.append(updateTree(data))
         self.trees = newTrees
     
@@ -366,7 +371,7 @@ def mpGrowTree(data):
 
 def updateTree(data):
   """Updates a tree - kept external like this for the purpose of multiprocessing."""
-  goal, gen, pruner, (tree, error, old_draw), prevCount, newCount, es, weightChannel, (code, errCode, addCode) = data[:9]
+  goal, gen, pruner, (tree, error, old_draw), prevCount, newCount, es, weightChannel, (code, errCode, addCode, useC) = data[:9]
   if len(data)>10: numpy.random.seed(data[10])
   
   # Choose which of the new samples are train and which are test, prepare the relevent inputs...
@@ -398,8 +403,8 @@ def updateTree(data):
   if pruner!=None:
     index = numpy.where(draw!=0)[0]
     if weightChannel==None: weights = numpy.asarray(draw, dtype=numpy.float32)
-    else: weights = es[weightChannel,:,prevCount:] * numpy.asarray(draw, dtype=numpy.float32)
-    tree.grow(goal, gen, pruner, es, index, weights, 0, code)
+    else: weights = numpy.asarray(es[weightChannel,:,prevCount:] * draw, dtype=numpy.float32)
+    tree.grow(goal, gen, pruner, es, index, weights, 0, code, useC)
 
   # If provided update the trees updated count...
   if len(data)>9: data[9].value += 1
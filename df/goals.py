@@ -8,6 +8,8 @@
 
 
 
+import math
+import weakref
 import numpy
 import numpy.linalg
 import numpy.random
@@ -39,6 +41,17 @@ class Goal:
     """Given a statistics entity this returns the associated entropy - this is used to choose which test is best."""
     raise NotImplementedError
   
+  def score_split(self, es, tIndex, fIndex, weights = None, useC = False):
+    """Scores a candidate test, given the exemplars that pass it, tIndex, and those that fail it, fIndex. Returns the tuple (true entropy, false entropy, true weight, false weight), where the entropies are those of the stats entities of each half and the weights are how much weight of exemplars went each way, for weighting the entropies to get the information gain. This is what the python version of tree growing calls for every candidate test, where only the entropy is required, so a Goal can override it to skip constructing the stats entities and do both halves at once. useC indicates if the Goal is allowed to use C code to do this, as decided by DF.allowC - if False it must stick to python. A default implimentation is provided."""
+    if weights is None:
+      tWeight = float(tIndex.shape[0])
+      fWeight = float(fIndex.shape[0])
+    else:
+      tWeight = float(weights[tIndex].sum())
+      fWeight = float(weights[fIndex].sum())
+    
+    return (self.entropy(self.stats(es, tIndex, weights)), self.entropy(self.stats(es, fIndex, weights)), tWeight, fWeight)
+  
   
   def postTreeGrow(self, root, gen):
     """After a tree is initially grown (At which point its shape is locked, but incrimental learning could still be applied.) this method is given the root node of the tree, and can do anything it likes to it - a post processing step, in case the stats objects need some extra cleverness. Most Goal-s do not need to impliment this. Also provided the generator for the tests in the tree."""
@@ -78,6 +91,63 @@ class Goal:
   def key(self):
     """Provides a unique string that can be used to hash the results of codeC, to avoid repeated generation. Must be implimented if codeC is implimented."""
     raise NotImplementedError
+  
+  def compileC(self, es):
+    """Some Goal-s use C code outside of codeC, e.g. in score_split - this is called with the exemplar set to be used before multiprocessing starts, so any such code can be compiled in advance, avoiding the race condition of every process compiling it at once. Only called when C is allowed. A default implimentation that does nothing is provided."""
+    pass
+
+
+
+# C code used by Classification.score_split, built once here rather than on every call as it is called for every candidate test...
+hist_entropy_code = start_cpp() + """
+// Builds the (weighted) histogram of the labels of the exemplars in index, in a stack buffer when there are few enough classes, and returns its entropy, with the total weight put into weight. Returns -1 if a label is outside the range [0, K), so the caller can fall back to code that can cope...
+template <typename L, typename I, typename W> double histEntropy(L * labels, I * index, int count, W * w, bool useWeights, int K, double & weight)
+{
+ double stackHist[64];
+ double * hist = (K<=64) ? stackHist : (double*)malloc(sizeof(double)*K);
+ for (int k=0; k<K; k++) hist[k] = 0.0;
+ 
+ // Weighted histogram, bailing out if a label is outside the expected range...
+  bool bad = false;
+  for (int i=0; i<count; i++)
+  {
+   int ind = index[i];
+   int cls = labels[ind];
+   if ((cls<0)||(cls>=K)) {bad = true; break;}
+   
+   hist[cls] += useWeights ? w[ind] : 1.0;
+  }
+ 
+ // Entropy of the histogram...
+  double ret = -1.0;
+  weight = 0.0;
+  if (!bad)
+  {
+   for (int k=0; k<K; k++) weight += hist[k];
+   
+   ret = 0.0;
+   if (weight>0.0)
+   {
+    for (int k=0; k<K; k++)
+    {
+     if (hist[k]>0.0) ret -= hist[k] * log(hist[k] / weight);
+    }
+    ret /= weight;
+   }
+  }
+ 
+ if (hist!=stackHist) free(hist);
+ return ret;
+}
+"""
+
+score_split_code = start_cpp(hist_entropy_code) + """
+double tWeight, fWeight;
+out[0] = histEntropy(labels, tIndex, NtIndex[0], w, useWeights!=0, K, tWeight);
+out[1] = histEntropy(labels, fIndex, NfIndex[0], w, useWeights!=0, K, fWeight);
+out[2] = tWeight;
+out[3] = fWeight;
+"""
 
 
 
@@ -87,37 +157,147 @@ class Classification(Goal):
     """You provide firstly how many classes exist (Or None if unknown.), and secondly the index of the channel that contains the ground truth for the exemplars. This channel must contain a single integer value, ranging from 0 inclusive to the number of classes, exclusive."""
     self.classCount = classCount
     self.channel = channel
+    self._binary = classCount==2 # Enables scalar fast paths for the common two class case.
+    
+    self.invalidate_cache()
   
   def clone(self):
     return Classification(self.classCount, self.channel)
   
+  def __getstate__(self):
+    ret = dict(self.__dict__)
+    ret['_labels'] = None # The cache is of the exemplar set - don't want that being serialised.
+    ret['_labelsES'] = None
+    return ret
+  
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._binary = self.classCount==2 # Also handles objects serialised before these existed.
+    self.invalidate_cache()
+  
+  def invalidate_cache(self):
+    """Empties the cache of class labels used to accelerate trainning (See _labelsOf.) - must be called if the labels of an exemplar set are editted in place between uses, and can be called after trainning to release the memory."""
+    self._labels = None
+    self._labelsES = None # Weak reference to the exemplar set the cache was made from.
+  
+  def _labelsOf(self, es):
+    """Returns the class label of every exemplar in es, as a contiguous 1D numpy.intp array, ready for numpy.bincount. The array is cached, so the label channel is only fetched and converted once per exemplar set rather than once per node; the cache is refreshed whenever a different exemplar set is provided or the number of exemplars changes (As happens with incrimental learning.), but editting the labels of an exemplar set in place will not be noticed (Call invalidate_cache.). Only a weak reference to the exemplar set is kept, so the cache does not keep it alive."""
+    if self._labelsES is None or self._labelsES() is not es or self._labels.shape[0]!=es.exemplars():
+      self._labels = numpy.ascontiguousarray(es[self.channel, :, 0], dtype=numpy.intp)
+      
+      try: self._labelsES = weakref.ref(es)
+      except TypeError: self._labelsES = None # Can't be weakly referenced - go without the cache.
+    return self._labels
+  
+  def _gather(self, es, index):
+    """Returns the class labels of the exemplars of es selected by index, which can be anything that indexes a 1D numpy array. Integer index arrays go through numpy.take, which is faster than fancy indexing; out of range indices raise an IndexError, as they would when indexing the weights."""
+    labels = self._labelsOf(es)
+    if isinstance(index, numpy.ndarray) and index.dtype.kind in 'iu': return numpy.take(labels, index)
+    else: return labels[index]
+  
+  def _bincount(self, es, index, weights, minlength):
+    """Returns the (weighted) histogram of the class labels of the exemplars of es selected by index, as a 1D numpy.float32 array at least minlength long."""
+    return numpy.bincount(self._gather(es, index), weights=weights[index] if weights is not None else None, minlength=minlength).astype(numpy.float32, copy=False)
+  
+  def _dist(self, stats):
+    """Returns a stats or summary entity as a 1D numpy.float32 array of the weight assigned to each class. Entities are generated as read only arrays by the python code, but the C code produces strings containing the same bytes - these are wrapped without a copy, which also gives a read only array."""
+    if isinstance(stats, numpy.ndarray): return stats
+    return numpy.frombuffer(stats, dtype=numpy.float32)
+  
   
   def stats(self, es, index, weights = None):
-    if len(index)!=0:
-      ret = numpy.bincount(es[self.channel, index, 0], weights=weights[index] if weights!=None else None)
-      ret = numpy.asarray(ret, dtype=numpy.float32)
+    labels = self._gather(es, index) if self._binary else None
+    
+    # Viewing the labels as unsigned makes negative labels huge, so a single max confirms they are all 0 or 1 - anything else is left to the general case, which copes with unexpected labels...
+    if labels is not None and (labels.shape[0]==0 or labels.view(numpy.uintp).max()<=1):
+      # Two classes - the weight of class 1 is a count or a dot product with the labels, the weight of class 0 the remainder...
+      if weights is None:
+        total = float(labels.shape[0])
+        w1 = float(numpy.count_nonzero(labels))
+      else:
+        w = weights[index]
+        total = float(w.sum())
+        w1 = float(numpy.dot(w, labels))
+      ret = numpy.array([total-w1, w1], dtype=numpy.float32)
+    
     else:
-      ret = numpy.zeros(self.classCount if self.classCount!=None else 1, dtype=numpy.float32)
+      cCount = self.classCount if self.classCount!=None else 1
+      
+      if len(index)!=0:
+        ret = self._bincount(es, index, weights, cCount)
+      else:
+        ret = numpy.zeros(cCount, dtype=numpy.float32)
+    
+    ret.setflags(write=False) # Stats entities are shared, never editted - the update methods work on a copy.
+    return ret
+  
+  def _accumulate(self, ret, es, index, weights = None):
+    """Adds the (weighted) class counts of the given exemplars into the histogram ret, in place, and returns it. ret is only replaced if it has to grow, when an unseen class turns up with classCount set to None. Raises a ValueError if any of the labels are negative. Sticks to numpy.bincount rather than numpy.add.at, as this module only requires numpy 1.7."""
+    codes = self._gather(es, index)
+    if len(codes)==0: return ret # Older numpy releases reject empty input to bincount.
+    
+    # Viewing the labels as unsigned makes negative labels huge, so a single max both validates them and gives the histogram size needed...
+    top = int(codes.view(numpy.uintp).max())
+    if top>numpy.iinfo(numpy.intp).max: raise ValueError('Class labels must be non-negative')
+    top += 1
     
-    if self.classCount!=None and ret.shape[0]<self.classCount: ret = numpy.concatenate((ret, numpy.zeros(self.classCount-ret.shape[0], dtype=numpy.float32))) # When numpy 1.6.0 becomes common this line can be flipped to a minlength term in the bincount call.
+    if top>ret.shape[0]:
+      ret = numpy.append(ret, numpy.zeros(top-ret.shape[0], dtype=numpy.float32))
     
-    return ret.tostring()
+    ret += numpy.bincount(codes, weights=weights[index] if weights is not None else None, minlength=ret.shape[0])
+    return ret
   
   def updateStats(self, stats, es, index, weights = None):
-    ret = numpy.fromstring(stats, dtype=numpy.float32)
-    toAdd = numpy.bincount(es[self.channel, index, 0], weights=weights[index] if weights!=None else None)
+    ret = self._accumulate(self._dist(stats).copy(), es, index, weights)
+    ret.setflags(write=False)
+    return ret
+
+  def entropy(self, stats):
+    # Uses H = log(total) - sum(c*log(c))/total, with c the unnormalised counts - adding the smallest float to the counts makes 0*log(0) evaluate to 0 without having to mask out the empty classes...
+    dist = self._dist(stats)
     
-    if ret.shape[0]<toAdd.shape[0]:
-      ret = numpy.append(ret, numpy.zeros(toAdd.shape[0]-ret.shape[0], dtype=numpy.float32))
+    if self._binary and dist.shape[0]==2:
+      # Closed form on the probability of class 1...
+      d0, d1 = dist.tolist()
+      total = d0 + d1
+      if total<=0.0: return 0.0
+      p = d1 / total
+      if p<=0.0 or p>=1.0: return 0.0
+      return -(p*math.log(p) + (1.0-p)*math.log(1.0-p))
     
-    ret[:toAdd.shape[0]] += toAdd
+    # The counts are stored as float32, but are summed and logged in float64, as large counts lose too much precision otherwise...
+    dist = dist.astype(numpy.float64)
+    total = float(dist.sum())
+    if total<=0.0: return 0.0
     
-    return ret.tostring()
+    logDist = dist + numpy.finfo(numpy.float64).tiny
+    numpy.log(logDist, logDist)
+    
+    return math.log(total) - float(numpy.dot(dist, logDist)) / total
+  
+  def score_split(self, es, tIndex, fIndex, weights = None, useC = False):
+    # Both halves are histogrammed and scored in a single call to C, which also sums the weights as it goes...
+    if (not useC) or weave==None or self.classCount==None or not isinstance(tIndex, numpy.ndarray) or not isinstance(fIndex, numpy.ndarray):
+      return Goal.score_split(self, es, tIndex, fIndex, weights)
+    
+    code = score_split_code
+    labels = self._labelsOf(es)
+    useWeights = 1 if weights is not None else 0
+    w = weights if weights is not None else numpy.zeros(0, dtype=numpy.float32)
+    K = self.classCount
+    out = numpy.empty(4, dtype=numpy.float64)
+    
+    weave.inline(code, ['labels', 'tIndex', 'fIndex', 'w', 'useWeights', 'K', 'out'], support_code=hist_entropy_code)
+    if out[0]<0.0 or out[1]<0.0: return Goal.score_split(self, es, tIndex, fIndex, weights) # Unexpected label - let the python code deal with it.
+    return tuple(out.tolist())
 
-  def entropy(self, stats):
-    dist = numpy.fromstring(stats, dtype=numpy.float32)
-    dist = dist[dist>1e-6] / dist.sum()
-    return -(dist*numpy.log(dist)).sum() # At the time of coding scipy.stats.distributions.entropy is broken-ish <rolls eyes> (Gives right answer at the expense of filling your screen with warnings about zeros.).
+
+  def compileC(self, es):
+    # Runs score_split on nothing, with both of the index types that get passed to it, to get the code compiled...
+    w = numpy.ones(0, dtype=numpy.float32)
+    for dtype in (numpy.int32, numpy.intp):
+      i = numpy.zeros(0, dtype=dtype)
+      self.score_split(es, i, i, w, True)
 
 
   def answer_types(self):
@@ -127,58 +307,54 @@ class Classification(Goal):
             'gen':'The default probability returned by the system is discriminative - this instead returns a generative result, P(data|class). A numpy array of float32 type containing the data probability for each class - will not sum to 1.',
             'gen_list':'Is to gen as prob_samples is to prob. Gives a list of probabilities representing P(class|data), so the consistancy can be accessed.'}
   
+  def _stack(self, stats_list, width = None):
+    """Converts a list of stats entities into a 2D numpy.float32 array with one row per entity. Rows are zero padded to the length of the longest, as lengths can differ when classCount is None; alternativly width can be provided to force the rows to a given length, truncating if need be."""
+    rows = map(self._dist, stats_list)
+    if width is None: width = max(map(len, rows))
+    
+    if all(map(lambda r: r.shape[0]==width, rows)): return numpy.array(rows, dtype=numpy.float32)
+    
+    ret = numpy.zeros((len(rows), width), dtype=numpy.float32)
+    for i, r in enumerate(rows):
+      l = min(width, r.shape[0])
+      ret[i,:l] = r[:l]
+    return ret
+  
   def answer(self, stats_list, which, es, index, trees):
     # Convert to a list, and process like that, before correcting for the return - simpler...
     single = isinstance(which, str)
     if single: which = [which]
     
-    # Calulate the probability distribution over class membership, both discriminativly and generativly...
+    # Calulate the probability distribution over class membership, both discriminativly and generativly - all trees are done at once, by stacking their histograms into a matrix...
     needGen = ('gen' in which) or ('gen_list' in which)
     
-    prob_list = []
-    if needGen: gen_list = []
-    
-    cCount = self.classCount if self.classCount!=None else 1
-    prob = numpy.zeros(cCount, dtype=numpy.float32)
-    if needGen: gen = numpy.zeros(cCount, dtype=numpy.float32)
+    cat = self._stack(stats_list)
     
-    for stats, tree in zip(stats_list, trees):
-      cat = numpy.fromstring(stats, dtype=numpy.float32)
-      
-      dist = cat / cat.sum()
-      prob_list.append(dist)
-      
-      if dist.shape[0]>prob.shape[0]:
-        prob = numpy.append(prob, numpy.zeros(dist.shape[0]-prob.shape[0], dtype=numpy.float32))
-      prob[:dist.shape[0]] += dist
-      
-      if needGen:
-        div = numpy.fromstring(tree.stats, dtype=numpy.float32)
-        use = numpy.where(div[:cat.shape[0]]>0.0)
-        g = numpy.zeros(cat.shape[0], dtype=numpy.float32)
-        g[use] = cat[use] / div[use]
-        gen_list.append(g)
-        
-        if g.shape[0]>gen.shape[0]:
-          gen = numpy.append(gen, numpy.zeros(g.shape[0]-gen.shape[0], dtype=numpy.float32))
-        gen[:g.shape[0]] += g
+    dist = cat / cat.sum(axis=1).reshape((-1,1))
+    prob_list = list(dist)
     
+    prob = dist.sum(axis=0)
     prob /= prob.sum()
-    if needGen: gen /= len(gen_list)
     
-    # Prepare the return...
-    def make_answer(t):
-      if t=='prob': return prob
-      elif t=='best': return prob.argmax()
-      elif t=='prob_samples': return prob_list
-      elif t=='gen': return gen
-      elif t=='gen_list': return gen_list
+    if needGen:
+      div = self._stack(map(lambda t: t.stats, trees), cat.shape[1])
+      use = numpy.where(div>0.0)
+      g = numpy.zeros(cat.shape, dtype=numpy.float32)
+      g[use] = cat[use] / div[use]
+      gen_list = list(g)
+      
+      gen = g.sum(axis=0)
+      gen /= len(gen_list)
     
-    ret = map(make_answer, which)
+    # Prepare the return, as a dictionary of everything calculated that is then indexed by which...
+    results = {'prob':prob, 'best':prob.argmax(), 'prob_samples':prob_list}
+    if needGen:
+      results['gen'] = gen
+      results['gen_list'] = gen_list
     
     # Make sure the correct thing is returned...
-    if single: return ret[0]
-    else: return tuple(ret)
+    if single: return results.get(which[0])
+    else: return tuple([results.get(t) for t in which])
   
   def answer_batch(self, stats_lists, which, es, indices, trees):
     # As this version might be dealing with lots of data we include a scipy.weave based optimisation...
@@ -208,6 +384,7 @@ class Classification(Goal):
       // Prep the return value...
        int item_count = PyList_Size(stats_lists);
        PyObject * ret = PyList_New(item_count);
+       bool ok = true; // Goes false if a stats entity can't be read as a buffer, in which case the python error has been set.
        
       // Loop through and do each exemplar in turn, adding its result to the return list...       
        for (int i=0; i<item_count; i++)
@@ -220,10 +397,13 @@ class Classification(Goal):
          npy_intp vecLength = 0;
          for (int j=0; j<statCount; j++)
          {
-          PyObject * s = PyList_GetItem(stats, j);
-          int len = PyString_Size(s) / sizeof(float);
+          const void * s;
+          Py_ssize_t sLen;
+          if (PyObject_AsReadBuffer(PyList_GetItem(stats, j), &s, &sLen)<0) {ok = false; break;}
+          int len = sLen / sizeof(float);
           if (len>vecLength) vecLength = len;
          }
+         if (!ok) break;
         
         // Resize the buffers accordingly, zero them...
          probBuf = (float*)realloc(probBuf, sizeof(float)*vecLength);
@@ -243,9 +423,11 @@ class Classification(Goal):
          
          for (int j=0; j<statCount; j++)
          {
-          PyObject * s = PyList_GetItem(stats, j);
-          int len = PyString_Size(s) / sizeof(float);
-          float * dist = (float*)(void*)PyString_AsString(s);
+          const void * s;
+          Py_ssize_t sLen;
+          if (PyObject_AsReadBuffer(PyList_GetItem(stats, j), &s, &sLen)<0) {ok = false; break;}
+          int len = sLen / sizeof(float);
+          float * dist = (float*)s;
           
           float sum = 0.0;
           for (int k=0; k<len; k++) sum += dist[k];
@@ -261,8 +443,10 @@ class Classification(Goal):
           
           if ((doGen)||(doGenList))
           {
-           PyObject * t = PyList_GetItem(root_stats, j);
-           float * div = (float*)(void*)PyString_AsString(t);
+           const void * t;
+           Py_ssize_t tLen;
+           if (PyObject_AsReadBuffer(PyList_GetItem(root_stats, j), &t, &tLen)<0) {ok = false; break;}
+           float * div = (float*)t;
            
            if (doGen)
            {
@@ -277,6 +461,13 @@ class Classification(Goal):
           }
          }
          
+         if (!ok)
+         {
+          Py_XDECREF(genList);
+          Py_XDECREF(probList);
+          break;
+         }
+         
         // Normalise the buffers...
          {
           float sum = 0.0;
@@ -348,6 +539,12 @@ class Classification(Goal):
        free(probBuf);
        free(genBuf);
        free(wCodes);
+       
+       if (!ok)
+       {
+        Py_DECREF(ret);
+        throw 1; // Gets weave to raise the python error.
+       }
       
       // Return the list of results...
        return_val = ret;
@@ -368,42 +565,49 @@ class Classification(Goal):
 
 
   def summary(self, es, index, weights = None):
-    ret = numpy.bincount(es[self.channel, index, 0], weights=weights[index] if weights!=None else None)
-    ret = numpy.asarray(ret, dtype=numpy.float32)
-    
-    if self.classCount!=None and ret.shape[0]<self.classCount: ret = numpy.append(ret, numpy.zeros(self.classCount-ret.shape[0], dtype=numpy.float32)) # When numpy 1.6.0 becomes common this line can be flipped to a minlength term in the bincount call.
+    cCount = self.classCount if self.classCount!=None else 1
+    ret = self._bincount(es, index, weights, cCount)
     
-    return ret.tostring()
+    ret.setflags(write=False)
+    return ret
   
   def updateSummary(self, summary, es, index, weights = None):
-    ret = numpy.fromstring(summary, dtype=numpy.float32)
-    toAdd = numpy.bincount(es[self.channel, index,0], weights=weights[index] if weights!=None else None)
-    
-    if ret.shape[0]<toAdd.shape[0]:
-      ret = numpy.append(ret, numpy.zeros(toAdd.shape[0]-ret.shape[0], dtype=numpy.float32))
-    
-    ret[:toAdd.shape[0]] += toAdd
-    
-    return ret.tostring()
+    ret = self._accumulate(self._dist(summary).copy(), es, index, weights)
+    ret.setflags(write=False)
+    return ret
   
   def error(self, stats, summary):
     # Treats the histogram of trainning samples as a probability distribution from which the answer is drawn from - the error is then the average probability of getting each sample in the sample wrong, and the weight the number of exemplars that went into the sample...
     ## Fetch the distribution/counts...
-    dist = numpy.fromstring(stats, dtype=numpy.float32)
-    dist /= dist.sum()
-    test = numpy.fromstring(summary, dtype=numpy.float32)
-    count = test.sum()
+    dist = self._dist(stats)
+    test = self._dist(summary)
     
-    if dist.shape[0] < test.shape[0]:
-      dist = numpy.append(dist, numpy.zeros(test.shape[0]-dist.shape[0], dtype=numpy.float32))
+    if self._binary and dist.shape[0]==2 and test.shape[0]==2:
+      # Scalar version of the below for two classes...
+      d0, d1 = dist.tolist()
+      t0, t1 = test.tolist()
+      total = d0 + d1
+      count = t0 + t1
+      
+      if count<=0.0: return (0.0, count)
+      if total<=0.0: return (1.0, count)
+      return (1.0 - (d0*t0 + d1*t1) / (total * count), count)
     
-    # Calculate and average the probabilities...
-    avgError = ((1.0-dist[:test.shape[0]])*test).sum() / count
+    # Reductions are done in float64, though the entities store float32...
+    count = float(test.sum(dtype=numpy.float64))
+    if count<=0.0: return (0.0, count) # No testing samples - no error, and no weight.
+    
+    total = float(dist.sum(dtype=numpy.float64))
+    if total<=0.0: return (1.0, count) # No training samples - everything is wrong.
+    
+    # Calculate and average the probabilities - sum((1-p)*test) is count - dot(p, test), with the normalisation of the distribution folded into the final division, so no temporary arrays are needed...
+    l = min(dist.shape[0], test.shape[0])
+    avgError = 1.0 - float(numpy.dot(dist[:l].astype(numpy.float64), test[:l].astype(numpy.float64))) / (total * count)
     
     return (avgError, count)
 
 
-  def codeC(self, name, escl):    
+  def codeC(self, name, escl):
     cStats = start_cpp() + """
     void %(name)s_stats(PyObject * data, Exemplar * index, void *& out, size_t & outLen)
     {
@@ -640,8 +844,8 @@ class DensityGaussian(Goal):
     # First calculate the weighted mean of the samples we have...
     data = es[0, index, :].copy()
     
-    w = weights[index] if weights!=None else None
-    weight = w.sum() if w!=None else float(data.shape[0])
+    w = weights[index] if weights is not None else None
+    weight = w.sum() if w is not None else float(data.shape[0])
     mean = numpy.asarray(numpy.average(data, axis=0, weights=w), dtype=numpy.float32)
    
     # Offset the data matrix by the mean...
@@ -655,7 +859,7 @@ class DensityGaussian(Goal):
     covar = numpy.identity(self.feats, dtype=numpy.float32)
     covar *= sym_var * self.prior_weight
     
-    if weights!=None:
+    if weights is not None:
       covar += numpy.dot(data.T, data * w.reshape((-1,1)))
       pw = self.prior_weight + weight
       covar *= pw / (pw**2.0 - self.prior_weight**2.0 - numpy.square(w).sum())
@@ -683,7 +887,7 @@ class DensityGaussian(Goal):
     exData = es[0, index, :].copy()
     
     exMean = numpy.empty(self.feats, dtype=numpy.float32)
-    if weights==None:
+    if weights is None:
       exMean[:] = exData.mean(axis=0)
       weight = float(exData.shape[0])
     else:
@@ -698,7 +902,7 @@ class DensityGaussian(Goal):
     # Calculate the covariance matrix...
     exCovar = numpy.zeros((self.feats, self.feats), dtype=numpy.float32)
     
-    if weights!=None: exData[:,:] *= w.reshape((-1,1))
+    if weights is not None: exData[:,:] *= w.reshape((-1,1))
     exCovar += numpy.dot(exData.T, exData)
     exCovar /= weight
     
@@ -887,7 +1091,7 @@ class DensityGaussian(Goal):
   def summary(self, es, index, weights = None):
     # The summary simply contains a lot of feature vectors, tightly packed, with weights - it will consume a lot of space...
     data = numpy.asarray(es[0,index,:], dtype=numpy.float32)
-    if weights==None: weights = numpy.ones(data.shape[0], dtype=numpy.float32)
+    if weights is None: weights = numpy.ones(data.shape[0], dtype=numpy.float32)
     else: weights = weights[index]
     
     data = numpy.append(weights.reshape((-1,1)), data, axis=1)
@@ -896,7 +1100,7 @@ class DensityGaussian(Goal):
   
   def updateSummary(self, summary, es, index, weights = None):
     data = numpy.asarray(es[0,index,:], dtype=numpy.float32)
-    if weights==None: weights = numpy.ones(data.shape[0], dtype=numpy.float32)
+    if weights is None: weights = numpy.ones(data.shape[0], dtype=numpy.float32)
     else: weights = weights[index]
     
     data = numpy.append(weights.reshape((-1,1)), data, axis=1)
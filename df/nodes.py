@@ -22,23 +22,23 @@ class Node:
   """Defines a node - these are the bread and butter of the system. Each decision tree is made out of nodes, each of which contains a binary test - if a feature vector passes the test then it travels to the true child node; if it fails it travels to the false child node (Note lowercase to avoid reserved word clash.). Eventually a leaf node is reached, where test==None, at which point the stats object is obtained, merged with the equivalent for all decision trees, and then provided as the answer to the user. Note that this python object uses the __slots__ techneque to keep it small - there will often be many thousands of these in a trained model."""
   __slots__ = ['test', 'true', 'false', 'stats', 'summary']
     
-  def __init__(self, goal, gen, pruner, es, index = slice(None), weights = None, depth = 0, stats = None, entropy = None, code = None):
-    """This recursivly grows the tree until the pruner says to stop. goal is a Goal object, so it knows what to optimise, gen a Generator object that provides tests for it to choose between and pruner is a Pruner object that decides when to stop growing. The exemplar set to train on is then provided, optionally with the indices of which members to use and weights to assign to them (weights align with the exemplar set, not with the relative exemplar indices defined by index. depth is the depth of this node - part of the recursive construction and used by the pruner as a possible reason to stop growing. stats is optionally provided to save on duplicate calculation, as it will be calculated as part of working out the split. entropy should match up with stats. The static method initC can be called to generate code that can be used by this constructor to accelerate test selection, but only if it is passed in."""
+  def __init__(self, goal, gen, pruner, es, index = slice(None), weights = None, depth = 0, stats = None, entropy = None, code = None, useC = False):
+    """This recursivly grows the tree until the pruner says to stop. goal is a Goal object, so it knows what to optimise, gen a Generator object that provides tests for it to choose between and pruner is a Pruner object that decides when to stop growing. The exemplar set to train on is then provided, optionally with the indices of which members to use and weights to assign to them (weights align with the exemplar set, not with the relative exemplar indices defined by index. depth is the depth of this node - part of the recursive construction and used by the pruner as a possible reason to stop growing. stats is optionally provided to save on duplicate calculation, as it will be calculated as part of working out the split. entropy should match up with stats. The static method initC can be called to generate code that can be used by this constructor to accelerate test selection, but only if it is passed in. If code is not provided then useC indicates if the goal may still use C code to score the tests, as decided by DF.allowC."""
     
     if goal==None: return # For the clone method.
     
     # Calculate the stats if not provided, and get the entropy...
-    if stats==None:
+    if stats is None:
       self.stats = goal.stats(es, index, weights)
     else:
       self.stats = stats
     self.summary = None
     
     # Use the grow method to do teh actual growth...
-    self.give_birth(goal, gen, pruner, es, index, weights, depth, entropy, code)
+    self.give_birth(goal, gen, pruner, es, index, weights, depth, entropy, code, useC)
   
-  def give_birth(self, goal, gen, pruner, es, index = slice(None), weights = None, depth = 0, entropy = None, code = None):
-    """This recursivly grows the tree until the pruner says to stop. goal is a Goal object, so it knows what to optimise, gen a Generator object that provides tests for it to choose between and pruner is a Pruner object that decides when to stop growing. The exemplar set to train on is then provided, optionally with the indices of which members to use and weights to assign to them (weights align with the exemplar set, not with the relative exemplar indices defined by index. depth is the depth of this node - part of the recursive construction and used by the pruner as a possible reason to stop growing. entropy should match up with self.stats. The static method initC can be called to generate code that can be used to accelerate test selection, but only if it is passed in."""
+  def give_birth(self, goal, gen, pruner, es, index = slice(None), weights = None, depth = 0, entropy = None, code = None, useC = False):
+    """This recursivly grows the tree until the pruner says to stop. goal is a Goal object, so it knows what to optimise, gen a Generator object that provides tests for it to choose between and pruner is a Pruner object that decides when to stop growing. The exemplar set to train on is then provided, optionally with the indices of which members to use and weights to assign to them (weights align with the exemplar set, not with the relative exemplar indices defined by index. depth is the depth of this node - part of the recursive construction and used by the pruner as a possible reason to stop growing. entropy should match up with self.stats. The static method initC can be called to generate code that can be used to accelerate test selection, but only if it is passed in. useC is as for the constructor."""
     if entropy==None: entropy = goal.entropy(self.stats)
 
     # Select the best test...
@@ -126,21 +126,10 @@ class Node:
         # Check its safe to continue...
         if tIndex.shape[0]==0 or fIndex.shape[0]==0: continue
       
-        # Calculate the statistics...
-        tStats = goal.stats(es, tIndex, weights)
-        fStats = goal.stats(es, fIndex, weights)
-      
-        # Calculate the information gain...
-        tEntropy = goal.entropy(tStats)
-        fEntropy = goal.entropy(fStats)
-      
-        if weights==None:
-          tWeight = float(tIndex.shape[0])
-          fWeight = float(fIndex.shape[0])
-        else:
-          tWeight = weights[tIndex].sum()
-          fWeight = weights[fIndex].sum()
+        # Calculate the information gain - only the entropy is needed, as the child nodes will make their own stats objects if they are created...
+        tEntropy, fEntropy, tWeight, fWeight = goal.score_split(es, tIndex, fIndex, weights, useC)
         div = tWeight + fWeight
+        if div<=0.0: continue # No weight reaches this node - no basis for choosing a test.
         tWeight /= div
         fWeight /= div
       
@@ -150,10 +139,8 @@ class Node:
         if infoGain>bestInfoGain:
           bestInfoGain = infoGain
           bestTest = test
-          trueStats = tStats
           trueEntropy = tEntropy
           trueIndex = tIndex
-          falseStats = fStats
           falseEntropy = fEntropy
           falseIndex = fIndex
     
@@ -161,8 +148,8 @@ class Node:
     self.test = bestTest
     if bestTest!=None and pruner.keep(depth, trueIndex.shape[0], falseIndex.shape[0], bestInfoGain, self)==True:
       # We are splitting - time to recurse...
-      self.true = Node(goal, gen, pruner, es, trueIndex, weights, depth+1, trueStats, trueEntropy, code)
-      self.false = Node(goal, gen, pruner, es, falseIndex, weights, depth+1, falseStats, falseEntropy, code)
+      self.true = Node(goal, gen, pruner, es, trueIndex, weights, depth+1, trueStats, trueEntropy, code, useC)
+      self.false = Node(goal, gen, pruner, es, falseIndex, weights, depth+1, falseStats, falseEntropy, code, useC)
     else:
       self.test = None
       self.true = None
@@ -617,6 +604,7 @@ class Node:
        float err = 0.0;
        float weight = 0.0;
         
+       bool ok = true;
        if (dummy==0) // To allow for a dummy run.
        {
         if (Nindex[0]!=0)
@@ -631,16 +619,17 @@ class Node:
          }
          test_set[Nindex[0]-1].next = 0;
          
-         error(self, data, test_set, err, weight, incNum==1);
+         ok = error(self, data, test_set, err, weight, incNum==1);
        
          free(test_set);
         }
         else
         {
-         error(self, data, 0, err, weight, incNum==1);
+         ok = error(self, data, 0, err, weight, incNum==1);
         }
        }
        
+       if (!ok) throw 1; // A python error is already set - throwing gets weave to raise it.
        return_val = err;
        """
        
@@ -659,14 +648,14 @@ class Node:
       # Update the summary at this node if needed...
       summary = None
       if es!=None and index.shape[0]!=0:
-        if self.summary==None: summary = goal.summary(es, index, weights)
+        if self.summary is None: summary = goal.summary(es, index, weights)
         else: summary = goal.updateSummary(self.summary, es, index, weights)
         if inc: self.summary = summary
     
       # Either recurse to the leafs or include this leaf...
       if self.test==None:
         # A leaf...
-        if summary!=None: store.append(goal.error(self.stats, summary))
+        if summary is not None: store.append(goal.error(self.stats, summary))
       else:
         # Not a leaf...
         if es!=None:
@@ -741,7 +730,8 @@ class Node:
     // test_set - Linked list of entities to use to generate/update the error.
     // err - Variable into which the error will be output. Must be 0.0 on call.
     // weight - Weight that can be used in the error calculation - basically temporary storage. Must be 0.0 on call.
-     void error(PyObject * node, PyObject * data, Exemplar * test_set, float & err, float & weight, bool inc)
+    // Returns false if a stats or summary entity could not be read as a buffer, in which case the python error is set.
+     bool error(PyObject * node, PyObject * data, Exemplar * test_set, float & err, float & weight, bool inc)
      {
       // Calculate/update the summary at this node, but only store it if inc is true...
        void * sum = 0;
@@ -754,9 +744,17 @@ class Node:
        }
        else
        {
-        sumLen = PyString_Size(summary);
+        const void * prev;
+        Py_ssize_t prevLen;
+        if (PyObject_AsReadBuffer(summary, &prev, &prevLen)<0)
+        {
+         Py_DECREF(summary);
+         return false;
+        }
+        
+        sumLen = prevLen;
         sum = realloc(sum, sumLen);
-        memcpy(sum, PyString_AsString(summary), sumLen);
+        memcpy(sum, prev, sumLen);
        
         goal_updateSummary(data, test_set, sum, sumLen);
        }
@@ -771,16 +769,18 @@ class Node:
       
       // If there is a test then recurse, otherwise calculate and include the error...
        PyObject * test = PyObject_GetAttrString(node, "test");
+       bool ok = true;
        
        if (test==Py_None)
        {
         // Leaf node - calculate and store the error...
          PyObject * stats = PyObject_GetAttrString(node, "stats");
          
-         void * s =  PyString_AsString(stats);
-         size_t sLen = PyString_Size(stats);
+         const void * s;
+         Py_ssize_t sLen;
+         ok = PyObject_AsReadBuffer(stats, &s, &sLen)>=0;
          
-         goal_error(s, sLen, sum, sumLen, err, weight);
+         if (ok) goal_error((void*)s, sLen, sum, sumLen, err, weight);
          
          Py_DECREF(stats);
        }
@@ -816,14 +816,14 @@ class Node:
          if ((pass!=0)||inc)
          {
           PyObject * child = PyObject_GetAttrString(node, "true");
-          error(child, data, pass, err, weight, inc);
+          ok = error(child, data, pass, err, weight, inc);
           Py_DECREF(child);
          }
 
-        if ((fail!=0)||inc)
+        if (ok&&((fail!=0)||inc))
         {
          PyObject * child = PyObject_GetAttrString(node, "false");
-         error(child, data, fail, err, weight, inc);
+         ok = error(child, data, fail, err, weight, inc);
          Py_DECREF(child);
         }
        }
@@ -831,6 +831,7 @@ class Node:
       // Clean up...
        Py_DECREF(test);
        free(sum);
+       return ok;
      }
     """
     
@@ -862,9 +863,10 @@ class Node:
        }
        test_set[Nindex[0]-1].next = 0;
          
-       addTrain(self, data, test_set);
+       bool ok = addTrain(self, data, test_set);
        
        free(test_set);
+       if (!ok) throw 1; // A python error is already set - throwing gets weave to raise it.
       }
       """
        
@@ -928,14 +930,23 @@ class Node:
       return None
     
     code += start_cpp() + """
-    void addTrain(PyObject * node, PyObject * data, Exemplar * test_set)
+    // Returns false if a stats entity could not be read as a buffer, in which case the python error is set...
+    bool addTrain(PyObject * node, PyObject * data, Exemplar * test_set)
     {
      // Update the stats at this node...
       PyObject * stats = PyObject_GetAttrString(node, "stats");
       
-      size_t stLen = PyString_Size(stats);
+      const void * prev;
+      Py_ssize_t prevLen;
+      if (PyObject_AsReadBuffer(stats, &prev, &prevLen)<0)
+      {
+       Py_DECREF(stats);
+       return false;
+      }
+      
+      size_t stLen = prevLen;
       void * st = malloc(stLen);
-      memcpy(st, PyString_AsString(stats), stLen);
+      memcpy(st, prev, stLen);
       
       goal_updateStats(data, test_set, st, stLen);
        
@@ -948,6 +959,7 @@ class Node:
      
      // If its not a leaf recurse down and do its children also...
       PyObject * test = PyObject_GetAttrString(node, "test");
+      bool ok = true;
        
       if (test!=Py_None)
       {
@@ -980,33 +992,34 @@ class Node:
         if (pass!=0)
         {
          PyObject * child = PyObject_GetAttrString(node, "true");
-         addTrain(child, data, pass);
+         ok = addTrain(child, data, pass);
          Py_DECREF(child);
         }
 
-        if (fail!=0)
+        if (ok&&(fail!=0))
         {
          PyObject * child = PyObject_GetAttrString(node, "false");
-         addTrain(child, data, fail);
+         ok = addTrain(child, data, fail);
          Py_DECREF(child);
         }
       }
       
       Py_DECREF(test);
+      return ok;
     }
     """
     
     return code
   
   
-  def grow(self, goal, gen, pruner, es, index = slice(None), weights = None, depth = 0, code = None):
-    """This is called on a tree that has already grown - it recurses to the children and continues as though growth never stopped. This can be to grow the tree further using a less stritc pruner or to grow the tree after further information has been added. code can be passed in as generated by the initC static method, and will be used to optimise test generation."""
+  def grow(self, goal, gen, pruner, es, index = slice(None), weights = None, depth = 0, code = None, useC = False):
+    """This is called on a tree that has already grown - it recurses to the children and continues as though growth never stopped. This can be to grow the tree further using a less stritc pruner or to grow the tree after further information has been added. code can be passed in as generated by the initC static method, and will be used to optimise test generation; useC is as for the constructor."""
     if self.test==None:
-      self.give_birth(goal, gen, pruner, es, index, weights, depth, code = code)
+      self.give_birth(goal, gen, pruner, es, index, weights, depth, code = code, useC = useC)
     else:
       res = gen.do(self.test, es, index)
       tIndex = index[res==True]
       fIndex = index[res==False]
       
-      self.true.grow(goal, gen, pruner, es, tIndex, weights, depth+1, code)
-      self.false.grow(goal, gen, pruner, es, fIndex, weights, depth+1, code)
+      self.true.grow(goal, gen, pruner, es, tIndex, weights, depth+1, code, useC)
+      self.false.grow(goal, gen, pruner, es, fIndex, weights, depth+1, code, useC)